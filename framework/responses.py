@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+from pydantic_core import to_jsonable_python
+
+
+def dumps(content: Any) -> bytes:
+    """Encode content as JSON with orjson.
+
+    datetime/date/UUID are serialized natively in C, with naive datetimes
+    treated as UTC and written with a ``Z`` suffix. Anything orjson does not
+    know (e.g. timedelta) falls back to Pydantic's JSON conversion so the wire
+    format matches what the models would produce.
+    """
+    return orjson.dumps(
+        content,
+        default=to_jsonable_python,
+        option=orjson.OPT_SERIALIZE_UUID | orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z,
+    )
+
+
+def dump_model(model: BaseModel) -> bytes:
+    return dumps(model.model_dump())
+
+
+class ORJSONResponse(Response):
+    """JSON response rendered with :func:`dumps`."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class JSONBytesResponse(Response):
+    """Response for content that is already encoded JSON bytes."""
+    media_type = "application/json"
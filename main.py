@@ -1,15 +1,20 @@
 from __future__ import annotations
 
+import asyncio
 import os
 import socket
-from datetime import datetime
+from contextlib import asynccontextmanager
+from functools import lru_cache
 
-from typing import Dict, List
+from typing import Any, Dict, FrozenSet, List, get_args
 from uuid import UUID
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi import Query, Path
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
 from typing import Optional
+from pydantic import BaseModel
 
 from models.person import PersonCreate, PersonRead, PersonUpdate
 from models.address import AddressCreate, AddressRead, AddressUpdate
@@ -18,20 +23,72 @@ from models.health import Health
 from models.songs import SongCreate, SongRead, SongUpdate
 from models.artists import ArtistCreate, ArtistRead, ArtistUpdate
 
+from framework.responses import JSONBytesResponse, ORJSONResponse, dumps
+from services.store import IndexedStore
+from utils.clock import utc_now
+
 port = int(os.environ.get("FASTAPIPORT", 8000))
 
 # -----------------------------------------------------------------------------
 # Fake in-memory "databases"
 # -----------------------------------------------------------------------------
-persons: Dict[UUID, PersonRead] = {}
-addresses: Dict[UUID, AddressRead] = {}
-songs: Dict[UUID, SongRead] = {}
-artists: Dict[UUID, ArtistRead] = {}
+# Equality filters on the indexed fields are answered from hash indexes;
+# the remaining filters are checked in one pass over their stored columns.
+persons: IndexedStore[PersonRead] = IndexedStore(
+    index=("uni", "email"),
+    multi_index={
+        "city": lambda p: {addr.city for addr in p.addresses},
+        "country": lambda p: {addr.country for addr in p.addresses},
+    },
+    scan=("first_name", "last_name", "phone"),
+    scan_func={"birth_date": lambda p: str(p.birth_date)},
+)
+addresses: IndexedStore[AddressRead] = IndexedStore(
+    index=("city", "postal_code", "country"),
+    scan=("street", "state"),
+    interned=("state",),
+)
+songs: IndexedStore[SongRead] = IndexedStore(
+    index=("name",),
+    multi_index={"artist_name": lambda s: {a.name for a in s.artists}},
+    scan=("id",),
+)
+artists: IndexedStore[ArtistRead] = IndexedStore(index=("name",), scan=("id",))
+
+# Host IP lookups go through the resolver, which can block. The IP is resolved
+# once at import and then refreshed every 60s in a threadpool by a background
+# task, so health probes only read the cached value.
+IP_REFRESH_SECONDS = 60
+
+def _resolve_ip() -> str:
+    return socket.gethostbyname(socket.gethostname())
+
+host_ip = _resolve_ip()
+
+def local_ip() -> str:
+    return host_ip
+
+async def _refresh_ip() -> None:
+    global host_ip
+    while True:
+        await asyncio.sleep(IP_REFRESH_SECONDS)
+        try:
+            host_ip = await run_in_threadpool(_resolve_ip)
+        except OSError:
+            pass  # keep serving the last known IP
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    task = asyncio.create_task(_refresh_ip())
+    yield
+    task.cancel()
 
 app = FastAPI(
     title="Person/Address API",
     description="Demo FastAPI app using Pydantic v2 models for Person and Address",
     version="0.1.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # -----------------------------------------------------------------------------
@@ -42,81 +99,114 @@ def make_health(echo: Optional[str], path_echo: Optional[str]=None) -> Health:
     return Health(
         status=200,
         status_message="OK",
-        timestamp=datetime.utcnow().isoformat() + "Z",
-        ip_address=socket.gethostbyname(socket.gethostname()),
+        timestamp=utc_now(),
+        ip_address=local_ip(),
         echo=echo,
         path_echo=path_echo
     )
 
 @app.get("/health", response_model=Health)
-def get_health_no_path(echo: str | None = Query(None, description="Optional echo string")):
+async def get_health_no_path(echo: str | None = Query(None, description="Optional echo string")):
     # Works because path_echo is optional in the model
-    return make_health(echo=echo, path_echo=None)
+    return ORJSONResponse(make_health(echo=echo, path_echo=None).model_dump())
 
 @app.get("/health/{path_echo}", response_model=Health)
-def get_health_with_path(
+async def get_health_with_path(
     path_echo: str = Path(..., description="Required echo in the URL path"),
     echo: str | None = Query(None, description="Optional echo string"),
 ):
-    return make_health(echo=echo, path_echo=path_echo)
+    return ORJSONResponse(make_health(echo=echo, path_echo=path_echo).model_dump())
+
+# -----------------------------------------------------------------------------
+# Partial updates
+# -----------------------------------------------------------------------------
+def non_nullable(model: type[BaseModel]) -> FrozenSet[str]:
+    """Fields of ``model`` whose type does not accept None."""
+    return frozenset(
+        name for name, field in model.model_fields.items()
+        if field.annotation is not None and type(None) not in get_args(field.annotation)
+    )
+
+def update_changes(update: BaseModel, not_null: FrozenSet[str]) -> Dict[str, Any]:
+    """Explicitly set fields of a PATCH body, to merge with model_copy.
+
+    Every *Update field is Optional, so an explicit null passes ingress
+    validation; model_copy does not validate, so nulls for fields in
+    ``not_null`` are rejected here with a 422 instead of being stored.
+    """
+    changes = {field: getattr(update, field) for field in update.model_fields_set}
+    errors = [
+        {"type": "none_forbidden", "loc": ("body", field), "msg": "Input should not be None", "input": None}
+        for field, value in changes.items()
+        if value is None and field in not_null
+    ]
+    if errors:
+        raise RequestValidationError(errors)
+    return changes
+
+PERSON_NOT_NULL = non_nullable(PersonRead)
+ADDRESS_NOT_NULL = non_nullable(AddressRead)
+SONG_NOT_NULL = non_nullable(SongRead)
+ARTIST_NOT_NULL = non_nullable(ArtistRead)
 
 @app.post("/addresses", response_model=AddressRead, status_code=201)
-def create_address(address: AddressCreate):
+async def create_address(address: AddressCreate):
     if address.id in addresses:
         raise HTTPException(status_code=400, detail="Address with this ID already exists")
-    addresses[address.id] = AddressRead(**address.model_dump())
-    return addresses[address.id]
+    # Request bodies are validated by FastAPI at ingress, so the stored models
+    # are built with model_construct and returned without response_model
+    # validation instead of being validated a second (and third) time.
+    now = utc_now()
+    addresses[address.id] = AddressRead.model_construct(
+        **address.__dict__, created_at=now, updated_at=now
+    )
+    return JSONBytesResponse(addresses.json(address.id), status_code=201)
 
 @app.get("/addresses", response_model=List[AddressRead])
-def list_addresses(
+async def list_addresses(
     street: Optional[str] = Query(None, description="Filter by street"),
     city: Optional[str] = Query(None, description="Filter by city"),
     state: Optional[str] = Query(None, description="Filter by state/region"),
     postal_code: Optional[str] = Query(None, description="Filter by postal code"),
     country: Optional[str] = Query(None, description="Filter by country"),
 ):
-    results = list(addresses.values())
-
-    if street is not None:
-        results = [a for a in results if a.street == street]
-    if city is not None:
-        results = [a for a in results if a.city == city]
-    if state is not None:
-        results = [a for a in results if a.state == state]
-    if postal_code is not None:
-        results = [a for a in results if a.postal_code == postal_code]
-    if country is not None:
-        results = [a for a in results if a.country == country]
+    body = addresses.query_json(
+        street=street, city=city, state=state, postal_code=postal_code, country=country
+    )
 
-    return results
+    # Returning a Response skips FastAPI's response_model validation/encoding;
+    # response_model is kept only for the OpenAPI schema.
+    return JSONBytesResponse(body)
 
 @app.get("/addresses/{address_id}", response_model=AddressRead)
-def get_address(address_id: UUID):
+async def get_address(address_id: UUID):
     if address_id not in addresses:
         raise HTTPException(status_code=404, detail="Address not found")
-    return addresses[address_id]
+    return JSONBytesResponse(addresses.json(address_id))
 
 @app.patch("/addresses/{address_id}", response_model=AddressRead)
-def update_address(address_id: UUID, update: AddressUpdate):
+async def update_address(address_id: UUID, update: AddressUpdate):
     if address_id not in addresses:
         raise HTTPException(status_code=404, detail="Address not found")
-    stored = addresses[address_id].model_dump()
-    stored.update(update.model_dump(exclude_unset=True))
-    addresses[address_id] = AddressRead(**stored)
-    return addresses[address_id]
+    # The stored model is already validated and update_changes rejects nulls
+    # it would not accept, so model_copy merges without re-running validators.
+    changes = update_changes(update, ADDRESS_NOT_NULL)
+    addresses[address_id] = addresses[address_id].model_copy(update=changes)
+    return JSONBytesResponse(addresses.json(address_id))
 
 # -----------------------------------------------------------------------------
 # Person endpoints
 # -----------------------------------------------------------------------------
 @app.post("/persons", response_model=PersonRead, status_code=201)
-def create_person(person: PersonCreate):
+async def create_person(person: PersonCreate):
     # Each person gets its own UUID; stored as PersonRead
-    person_read = PersonRead(**person.model_dump())
+    now = utc_now()
+    person_read = PersonRead.model_construct(**person.__dict__, created_at=now, updated_at=now)
     persons[person_read.id] = person_read
-    return person_read
+    return JSONBytesResponse(persons.json(person_read.id), status_code=201)
 
 @app.get("/persons", response_model=List[PersonRead])
-def list_persons(
+async def list_persons(
     uni: Optional[str] = Query(None, description="Filter by Columbia UNI"),
     first_name: Optional[str] = Query(None, description="Filter by first name"),
     last_name: Optional[str] = Query(None, description="Filter by last name"),
@@ -126,90 +216,72 @@ def list_persons(
     city: Optional[str] = Query(None, description="Filter by city of at least one address"),
     country: Optional[str] = Query(None, description="Filter by country of at least one address"),
 ):
-    results = list(persons.values())
-
-    if uni is not None:
-        results = [p for p in results if p.uni == uni]
-    if first_name is not None:
-        results = [p for p in results if p.first_name == first_name]
-    if last_name is not None:
-        results = [p for p in results if p.last_name == last_name]
-    if email is not None:
-        results = [p for p in results if p.email == email]
-    if phone is not None:
-        results = [p for p in results if p.phone == phone]
-    if birth_date is not None:
-        results = [p for p in results if str(p.birth_date) == birth_date]
-
-    # nested address filtering
-    if city is not None:
-        results = [p for p in results if any(addr.city == city for addr in p.addresses)]
-    if country is not None:
-        results = [p for p in results if any(addr.country == country for addr in p.addresses)]
-
-    return results
+    body = persons.query_json(
+        uni=uni,
+        first_name=first_name,
+        last_name=last_name,
+        email=email,
+        phone=phone,
+        birth_date=birth_date,
+        city=city,
+        country=country,
+    )
+
+    return JSONBytesResponse(body)
 
 @app.get("/persons/{person_id}", response_model=PersonRead)
-def get_person(person_id: UUID):
+async def get_person(person_id: UUID):
     if person_id not in persons:
         raise HTTPException(status_code=404, detail="Person not found")
-    return persons[person_id]
+    return JSONBytesResponse(persons.json(person_id))
 
 @app.patch("/persons/{person_id}", response_model=PersonRead)
-def update_person(person_id: UUID, update: PersonUpdate):
+async def update_person(person_id: UUID, update: PersonUpdate):
     if person_id not in persons:
         raise HTTPException(status_code=404, detail="Person not found")
-    stored = persons[person_id].model_dump()
-    stored.update(update.model_dump(exclude_unset=True))
-    persons[person_id] = PersonRead(**stored)
-    return persons[person_id]
+    changes = update_changes(update, PERSON_NOT_NULL)
+    persons[person_id] = persons[person_id].model_copy(update=changes)
+    return JSONBytesResponse(persons.json(person_id))
 
 # Extra endpoints
 # -----------------------------------------------------------------------------
 # Song endpoints
 # -----------------------------------------------------------------------------
 @app.post("/songs", response_model=SongRead, status_code=201)
-def create_song(song: SongCreate):
+async def create_song(song: SongCreate):
     # Each song gets its own UUID; stored as SongRead
     if song.id in songs:
         raise HTTPException(status_code=400, detail="Song with this ID already exists")
-    song_read = SongRead(**song.model_dump())
+    now = utc_now()
+    song_read = SongRead.model_construct(**song.__dict__, created_at=now, updated_at=now)
     songs[song_read.id] = song_read
-    return song_read
+    return JSONBytesResponse(songs.json(song_read.id), status_code=201)
 
 @app.get("/songs", response_model= List[SongRead])
-def list_song(
+async def list_song(
     id: Optional[str] = Query(None, description="Filter by id"),
     name: Optional[str] = Query(None, description="Filter by name"),
     artist_name: Optional[str] = Query(None, description="Filter by name of at least one artist")
 ):
-    results = list(songs.values())
-
-    if id is not None:
-        results = [s for s in results if s.id == id]
-    if name is not None:
-        results = [s for s in results if s.name == name]
-    if artist_name is not None:
-        results = [s for s in results if any(a.name == artist_name for a in s.artists)]
-    return results
+    body = songs.query_json(id=id, name=name, artist_name=artist_name)
+    return JSONBytesResponse(body)
 
 @app.get("/songs/{song_id}", response_model=SongRead)
-def get_song(song_id: UUID):
+async def get_song(song_id: UUID):
     if song_id not in songs:
         raise HTTPException(status_code=404, detail="Song not found")
-    return songs[song_id]
+    return JSONBytesResponse(songs.json(song_id))
 
 @app.patch("/songs/{song_id}", response_model=SongRead)
-def update_song(song_id: UUID, update: SongUpdate):
+async def update_song(song_id: UUID, update: SongUpdate):
     if song_id not in songs:
         raise HTTPException(status_code=404, detail="Song not found")
-    stored = songs[song_id].model_dump()
-    stored.update(update.model_dump(exclude_unset=True))
-    songs[song_id] = SongRead(**stored)
-    return songs[song_id]
+    changes = update_changes(update, SONG_NOT_NULL)
+    songs[song_id] = songs[song_id].model_copy(update=changes)
+    return JSONBytesResponse(songs.json(song_id))
 
 @app.delete("/songs/{song_id}", response_model=dict)
-def delete_song(song_id: UUID):
+async def delete_song(song_id: UUID):
     if song_id not in songs:
         raise HTTPException(status_code=404, detail="Song not found")
     deleted_song = songs.pop(song_id)  # remove from dictionary
@@ -219,41 +291,39 @@ def delete_song(song_id: UUID):
 # Artists endpoints
 # -----------------------------------------------------------------------------
 @app.post("/artists", response_model=ArtistRead, status_code=201)
-def create_artists(artist: ArtistCreate):
+async def create_artists(artist: ArtistCreate):
     if artist.id in artists:
         raise HTTPException(status_code=400, detail="Artist with this ID already exists")
-    artists[artist.id] = ArtistRead(**artist.model_dump())
-    return artists[artist.id]
+    now = utc_now()
+    artists[artist.id] = ArtistRead.model_construct(
+        **artist.__dict__, created_at=now, updated_at=now
+    )
+    return JSONBytesResponse(artists.json(artist.id), status_code=201)
 
 @app.get("/artists", response_model= List[ArtistRead])
-def list_artist(
+async def list_artist(
     id: Optional[str] = Query(None, description="Filter by id"),
     name: Optional[str] = Query(None, description="Filter by name"),
 ):
-    results = list(artists.values())
-    if id is not None:
-        results = [a for a in results if a.id == id]
-    if name is not None:
-        results = [a for a in results if a.name == name]
-    return results
+    body = artists.query_json(id=id, name=name)
+    return JSONBytesResponse(body)
 
 @app.get("/artists/{artist_id}", response_model=ArtistRead)
-def get_artist(artist_id: UUID):
+async def get_artist(artist_id: UUID):
     if artist_id not in artists:
         raise HTTPException(status_code=404, detail="Artist not found")
-    return artists[artist_id]
+    return JSONBytesResponse(artists.json(artist_id))
 
 @app.patch("/artist/{artist_id}", response_model=ArtistRead)
-def update_artist(artist_id: UUID, update: ArtistUpdate):
+async def update_artist(artist_id: UUID, update: ArtistUpdate):
     if artist_id not in artists:
         raise HTTPException(status_code=404, detail="Artist not found")
-    stored = artists[artist_id].model_dump()
-    stored.update(update.model_dump(exclude_unset=True))
-    artists[artist_id] = ArtistRead(**stored)
-    return artists[artist_id]
+    changes = update_changes(update, ARTIST_NOT_NULL)
+    artists[artist_id] = artists[artist_id].model_copy(update=changes)
+    return JSONBytesResponse(artists.json(artist_id))
 
 @app.delete("/artist/{artist_id}", response_model=dict)
-def delete_artist(artist_id: UUID):
+async def delete_artist(artist_id: UUID):
     if artist_id not in artists:
         raise HTTPException(status_code=404, detail="Artist not found")
     deleted_artist = artists.pop(artist_id)  # remove from dictionary
@@ -263,13 +333,51 @@ def delete_artist(artist_id: UUID):
 # Root
 # -----------------------------------------------------------------------------
 @app.get("/")
-def root():
+async def root():
     return {"message": "Welcome to the Person/Address API. See /docs for OpenAPI UI."}
 
+# -----------------------------------------------------------------------------
+# OpenAPI schema and docs
+# -----------------------------------------------------------------------------
+# FastAPI keeps its /docs, /docs/oauth2-redirect and /redoc routes; only the
+# schema route is replaced, so the encoded schema is cached instead of
+# app.openapi() being re-encoded on every request.
+@lru_cache(maxsize=16)
+def openapi_bytes(root_path: str) -> bytes:
+    """The OpenAPI schema as JSON, with ``root_path`` listed first in servers
+    the way FastAPI's own route does when served behind a proxy prefix."""
+    schema = app.openapi()
+    servers = schema.get("servers", [])
+    if root_path and app.root_path_in_servers and root_path not in {s.get("url") for s in servers}:
+        schema = {**schema, "servers": [{"url": root_path}, *servers]}
+    return dumps(schema)
+
+async def openapi_json(request: Request) -> JSONBytesResponse:
+    return JSONBytesResponse(openapi_bytes(request.scope.get("root_path", "").rstrip("/")))
+
+app.router.routes = [
+    route for route in app.router.routes if getattr(route, "path", None) != app.openapi_url
+]
+app.add_route(app.openapi_url, openapi_json, include_in_schema=False)
+
 # -----------------------------------------------------------------------------
 # Entrypoint for `python main.py`
 # -----------------------------------------------------------------------------
+# DEV=1 runs the auto-reloading dev server. Otherwise uvloop + httptools are
+# used; WORKERS defaults to 1 because the "databases" above live in process
+# memory and each worker would hold its own copy.
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run("main:app", host="0.0.0.0", port=port, reload=True)
+    if os.environ.get("DEV"):
+        uvicorn.run("main:app", host="0.0.0.0", port=port, reload=True)
+    else:
+        uvicorn.run(
+            "main:app",
+            host="0.0.0.0",
+            port=port,
+            workers=int(os.environ.get("WORKERS", 1)),
+            loop="uvloop",
+            http="httptools",
+            log_level="warning",
+        )
@@ -5,6 +5,8 @@ from uuid import UUID, uuid4
 from datetime import datetime
 from pydantic import BaseModel, Field
 
+from utils.clock import utc_now
+
 
 class AddressBase(BaseModel):
     id: UUID = Field(
@@ -108,17 +110,18 @@ class AddressUpdate(BaseModel):
 
 class AddressRead(AddressBase):
     created_at: datetime = Field(
-        default_factory=datetime.utcnow,
+        default_factory=utc_now,
         description="Creation timestamp (UTC).",
         json_schema_extra={"example": "2025-01-15T10:20:30Z"},
     )
     updated_at: datetime = Field(
-        default_factory=datetime.utcnow,
+        default_factory=utc_now,
         description="Last update timestamp (UTC).",
         json_schema_extra={"example": "2025-01-16T12:00:00Z"},
     )
 
     model_config = {
+        "frozen": True,
         "json_schema_extra": {
             "examples": [
                 {
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
-from pydantic import BaseModel, Field, EmailStr, StringConstraints
+from pydantic import BaseModel, Field
 from typing import Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 from uuid import UUID, uuid4
 
+from utils.clock import utc_now
+
 
 class ArtistBase(BaseModel):
     id: UUID = Field(
@@ -61,16 +63,17 @@ class ArtistUpdate(ArtistBase):
 
 class ArtistRead(ArtistBase):
     created_at: datetime = Field(
-        default_factory=datetime.utcnow,
+        default_factory=utc_now,
         description="Creation timestamp (UTC).",
         json_schema_extra={"example": "2025-01-15T10:20:30Z"},
     )
     updated_at: datetime = Field(
-        default_factory=datetime.utcnow,
+        default_factory=utc_now,
         description="Last update timestamp (UTC).",
         json_schema_extra={"example": "2025-01-16T12:00:00Z"},
     )
     model_config = {
+        "frozen": True,
         "json_schema_extra": {
             "examples": [
                 {
@@ -1,10 +1,11 @@
 from pydantic import BaseModel, Field
 from typing import Optional
+from datetime import datetime
 
 class Health(BaseModel):
     status: int = Field(description="Numeric status code (e.g., 200 for OK)")
     status_message: str = Field(description="Human-readable status message")
-    timestamp: str = Field(description="Timestamp in ISO 8601 format (UTC)")
+    timestamp: datetime = Field(description="Timestamp in ISO 8601 format (UTC)")
     ip_address: str = Field(description="IP address of the responding service")
     echo: str | None = Field(default=None, description="Optional echo (query param)")
     path_echo: str | None = Field(default=None, description="Echo from path param (/health/{path_echo})")
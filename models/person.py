@@ -6,6 +6,7 @@ from datetime import date, datetime
 from pydantic import BaseModel, Field, EmailStr, StringConstraints
 
 from .address import AddressBase
+from utils.clock import utc_now
 
 # Columbia UNI: 2–3 lowercase letters + 1–4 digits (e.g., abc1234)
 UNIType = Annotated[str, StringConstraints(pattern=r"^[a-z]{2,3}\d{1,4}$")]
@@ -172,17 +173,18 @@ class PersonRead(PersonBase):
         json_schema_extra={"example": "99999999-9999-4999-8999-999999999999"},
     )
     created_at: datetime = Field(
-        default_factory=datetime.utcnow,
+        default_factory=utc_now,
         description="Creation timestamp (UTC).",
         json_schema_extra={"example": "2025-01-15T10:20:30Z"},
     )
     updated_at: datetime = Field(
-        default_factory=datetime.utcnow,
+        default_factory=utc_now,
         description="Last update timestamp (UTC).",
         json_schema_extra={"example": "2025-01-16T12:00:00Z"},
     )
 
     model_config = {
+        "frozen": True,
         "json_schema_extra": {
             "examples": [
                 {
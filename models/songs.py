@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from pydantic import BaseModel, Field, EmailStr, StringConstraints
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime, timedelta
 from uuid import UUID, uuid4
 from .artists import ArtistBase
+from utils.clock import utc_now
 
 class SongBase(BaseModel):
     id: UUID = Field(
@@ -120,16 +121,17 @@ class SongRead(SongBase):
         json_schema_extra={"example": "99999999-9999-4999-8999-999999999999"},
     )
     created_at: datetime = Field(
-        default_factory=datetime.utcnow,
+        default_factory=utc_now,
         description="Creation timestamp (UTC).",
         json_schema_extra={"example": "2025-01-15T10:20:30Z"},
     )
     updated_at: datetime = Field(
-        default_factory=datetime.utcnow,
+        default_factory=utc_now,
         description="Last update timestamp (UTC).",
         json_schema_extra={"example": "2025-01-16T12:00:00Z"},
     )
     model_config = {
+        "frozen": True,
         "json_schema_extra": {
             "examples": [
                 {
@@ -0,0 +1,325 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import MutableMapping
+from functools import lru_cache
+from typing import (
+    Any, Callable, Dict, FrozenSet, Hashable, Iterable, Iterator, List, Optional, Set, Tuple, TypeVar,
+)
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from framework.responses import dump_model
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# Returns every index key of a row, e.g. the cities of all of a person's addresses.
+KeyFunc = Callable[[BaseModel], Iterable[Hashable]]
+
+# Returns the value a row stores in a scanned column.
+ColumnFunc = Callable[[BaseModel], Any]
+
+# Filters row numbers against one query value per column: scan(rows, columns, values).
+ScanFunc = Callable[[Iterable[int], Tuple[List[Any], ...], Tuple[Any, ...]], List[int]]
+
+
+@lru_cache(maxsize=256)
+def compile_scan(width: int) -> ScanFunc:
+    """Compile a straight-line filter over ``width`` columns.
+
+    For two columns this is
+    ``[i for i in rows if c0[i] == v0 and c1[i] == v1]``, so a scan touches
+    only the queried columns and never the row objects.
+    """
+    cols = [f"c{n}" for n in range(width)]
+    vals = [f"v{n}" for n in range(width)]
+    condition = " and ".join(f"{c}[i] == {v}" for c, v in zip(cols, vals))
+    source = (
+        "def scan(rows, columns, values):\n"
+        f"    {', '.join(cols)}, = columns\n"
+        f"    {', '.join(vals)}, = values\n"
+        f"    return [i for i in rows if {condition}]\n"
+    )
+    namespace: Dict[str, Any] = {}
+    exec(source, namespace)
+    return namespace["scan"]
+
+
+class Interner:
+    """Dictionary encoding: maps each distinct string to a small int id.
+
+    Interned columns compare ints instead of strings, and a query value that
+    was never interned cannot match any row. Ids are never released, so only
+    low-cardinality columns (states, countries) should be interned.
+    """
+
+    def __init__(self) -> None:
+        self._ids: Dict[str, int] = {}
+
+    def intern(self, value: Optional[str]) -> Optional[int]:
+        if value is None:
+            return None
+        id_ = self._ids.get(value)
+        if id_ is None:
+            id_ = self._ids[value] = len(self._ids)
+        return id_
+
+    def lookup(self, value: str) -> Optional[int]:
+        """Id of an already interned string, or None if it was never seen."""
+        return self._ids.get(value)
+
+
+strings = Interner()
+
+
+class BloomFilter:
+    """Bloom filter with three probes over a bit array sized for ``capacity`` values.
+
+    ``value in bloom`` is False only if the value was added. Values are never
+    removed, so the store rebuilds the filter from its column once
+    :attr:`full` (more adds than capacity, stale values included).
+    """
+
+    __slots__ = ("_bits", "_size", "_count", "capacity")
+
+    BITS_PER_VALUE = 10  # ~2% false positives at capacity with three probes
+
+    def __init__(self, capacity: int = 64) -> None:
+        self.capacity = capacity
+        self._size = capacity * self.BITS_PER_VALUE
+        self._bits = bytearray((self._size + 7) // 8)
+        self._count = 0
+
+    def _probes(self, value: Hashable) -> Tuple[int, int, int]:
+        h = hash(value) & 0xFFFFFFFFFFFFFFFF
+        step = (h >> 32) | 1
+        size = self._size
+        return h % size, (h + step) % size, (h + 2 * step) % size
+
+    def add(self, value: Hashable) -> None:
+        bits = self._bits
+        for bit in self._probes(value):
+            bits[bit >> 3] |= 1 << (bit & 7)
+        self._count += 1
+
+    def __contains__(self, value: Hashable) -> bool:
+        bits = self._bits
+        return all(bits[bit >> 3] & (1 << (bit & 7)) for bit in self._probes(value))
+
+    @property
+    def full(self) -> bool:
+        return self._count > self.capacity
+
+
+def _discard(index: Dict[Hashable, Set[UUID]], value: Hashable, key: UUID) -> None:
+    ids = index[value]
+    ids.discard(key)
+    if not ids:
+        del index[value]
+
+
+class IndexedStore(MutableMapping[UUID, ModelT]):
+    """In-memory table of models keyed by UUID, with secondary hash indexes.
+
+    Rows live in dense lists addressed by row number, with a UUID -> row map
+    for key lookups; deleting a row moves the last row into its slot, so the
+    row order is insertion order only until the first deletion.
+
+    ``index`` names scalar attributes to index; ``multi_index`` maps a filter
+    name to a function returning several keys per row (nested fields). The
+    indexes are kept in sync on every assignment and deletion.
+
+    ``scan`` names attributes filtered by scanning instead; ``scan_func`` maps
+    a filter name to a function computing the scanned value. Scanned values
+    are kept column-wise (one list per filter, aligned with the rows) so a
+    scan reads only the columns being filtered. Columns named in ``interned``
+    (low-cardinality only) hold string ids from :data:`strings`; the other
+    scanned columns keep a Bloom filter so absent values skip the scan.
+
+    Each row's JSON encoding is computed once when it is stored, and reads
+    are served from those bytes (:meth:`json`, :meth:`query_json`).
+    """
+
+    def __init__(
+        self,
+        index: Iterable[str] = (),
+        multi_index: Optional[Dict[str, KeyFunc]] = None,
+        scan: Iterable[str] = (),
+        scan_func: Optional[Dict[str, ColumnFunc]] = None,
+        interned: Iterable[str] = (),
+    ):
+        self._row_of: Dict[UUID, int] = {}
+        self._ids: List[UUID] = []
+        self._rows: List[ModelT] = []
+        self._json: List[bytes] = []
+        self._all_json: Optional[bytes] = None
+        self._query_cache = lru_cache(maxsize=256)(self._encode_query)
+        self._key_funcs: Dict[str, KeyFunc] = {
+            name: (lambda row, attr=name: (getattr(row, attr),)) for name in index
+        }
+        self._key_funcs.update(multi_index or {})
+        self._indexes: Dict[str, Dict[Hashable, Set[UUID]]] = {
+            name: defaultdict(set) for name in self._key_funcs
+        }
+        # Index keys of each stored row, e.g. the frozenset of a person's cities.
+        self._row_keys: List[Dict[str, FrozenSet[Hashable]]] = []
+        self._column_funcs: Dict[str, ColumnFunc] = {
+            name: (lambda row, attr=name: getattr(row, attr)) for name in scan
+        }
+        self._column_funcs.update(scan_func or {})
+        self._interned = frozenset(interned)
+        for name in self._interned:
+            func = self._column_funcs[name]
+            self._column_funcs[name] = lambda row, func=func: strings.intern(func(row))
+        self._columns: Dict[str, List[Any]] = {name: [] for name in self._column_funcs}
+        self._blooms: Dict[str, BloomFilter] = {
+            name: BloomFilter() for name in self._column_funcs if name not in self._interned
+        }
+        # Every per-row list, kept the same length and in the same row order.
+        self._arrays: List[List[Any]] = [
+            self._ids, self._rows, self._json, self._row_keys, *self._columns.values()
+        ]
+
+    def __getitem__(self, key: UUID) -> ModelT:
+        return self._rows[self._row_of[key]]
+
+    def __setitem__(self, key: UUID, row: ModelT) -> None:
+        pos = self._row_of.get(key)
+        if pos is None:
+            pos = self._row_of[key] = len(self._ids)
+            for array in self._arrays:
+                array.append(None)
+            self._ids[pos] = key
+            self._row_keys[pos] = {}
+        self._rows[pos] = row
+        self._json[pos] = dump_model(row)
+        self._invalidate()
+
+        # Only index buckets whose keys changed are touched, so e.g. a PATCH
+        # that leaves a person's addresses alone skips the city/country indexes.
+        old_keys = self._row_keys[pos]
+        new_keys = {name: frozenset(key_func(row)) for name, key_func in self._key_funcs.items()}
+        for name, keys in new_keys.items():
+            old = old_keys.get(name, frozenset())
+            if keys == old:
+                continue
+            index = self._indexes[name]
+            for value in old - keys:
+                _discard(index, value, key)
+            for value in keys - old:
+                index[value].add(key)
+        self._row_keys[pos] = new_keys
+
+        for name, column_func in self._column_funcs.items():
+            value = self._columns[name][pos] = column_func(row)
+            bloom = self._blooms.get(name)
+            if bloom is not None:
+                bloom.add(value)
+                if bloom.full:
+                    self._rebuild_bloom(name)
+
+    def __delitem__(self, key: UUID) -> None:
+        pos = self._row_of.pop(key)
+        self._invalidate()
+        for name, keys in self._row_keys[pos].items():
+            index = self._indexes[name]
+            for value in keys:
+                _discard(index, value, key)
+
+        # Keep the lists dense: move the last row into the freed slot.
+        last = len(self._ids) - 1
+        if pos != last:
+            self._row_of[self._ids[last]] = pos
+            for array in self._arrays:
+                array[pos] = array[last]
+        for array in self._arrays:
+            array.pop()
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._row_of
+
+    def _rebuild_bloom(self, name: str) -> None:
+        """Resize a column's Bloom filter to twice the row count, dropping stale values."""
+        column = self._columns[name]
+        bloom = self._blooms[name] = BloomFilter(max(64, 2 * len(column)))
+        for value in column:
+            bloom.add(value)
+
+    def __iter__(self) -> Iterator[UUID]:
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _lookup(self, filters: Dict[str, Hashable]) -> Optional[List[int]]:
+        """Rows matching every indexed filter, in row order.
+
+        Returns None when no indexed filter is given, meaning "all rows".
+        """
+        candidates: Optional[Set[UUID]] = None
+        for name, value in filters.items():
+            ids = self._indexes[name].get(value)
+            if not ids:
+                return []
+            candidates = ids if candidates is None else candidates & ids
+        if candidates is None:
+            return None
+        row_of = self._row_of
+        return sorted([row_of[key] for key in candidates])
+
+    def _match(self, filters: Dict[str, Optional[Any]]) -> Iterable[int]:
+        """Rows equal to every non-None filter, in row order.
+
+        Indexed filters narrow the candidates first; the rest are checked in
+        one compiled pass over their columns.
+        """
+        indexed: Dict[str, Any] = {}
+        columns: List[List[Any]] = []
+        values: List[Any] = []
+        for name, value in filters.items():
+            if value is None:
+                continue
+            if name in self._indexes:
+                indexed[name] = value
+                continue
+            if name in self._interned:
+                value = strings.lookup(value)
+                if value is None:
+                    return []
+            elif value not in self._blooms[name]:
+                return []
+            columns.append(self._columns[name])
+            values.append(value)
+
+        rows = self._lookup(indexed)
+        if rows is None:
+            rows = range(len(self._ids))
+        if columns:
+            rows = compile_scan(len(columns))(rows, tuple(columns), tuple(values))
+        return rows
+
+    def json(self, key: UUID) -> bytes:
+        """JSON encoding of one row, computed when the row was stored."""
+        return self._json[self._row_of[key]]
+
+    def query_json(self, **filters: Optional[Any]) -> bytes:
+        """JSON array of the rows equal to every non-None filter, in row order.
+
+        The result joins the per-row encodings made at write time, and is
+        memoized until the next write to the store: the unfiltered list in
+        its own slot, filtered lists per filter combination.
+        """
+        if all(value is None for value in filters.values()):
+            if self._all_json is None:
+                self._all_json = b"[" + b",".join(self._json) + b"]"
+            return self._all_json
+        return self._query_cache(**filters)
+
+    def _encode_query(self, **filters: Optional[Any]) -> bytes:
+        encoded = self._json
+        return b"[" + b",".join([encoded[i] for i in self._match(filters)]) + b"]"
+
+    def _invalidate(self) -> None:
+        self._all_json = None
+        self._query_cache.cache_clear()
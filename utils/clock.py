@@ -0,0 +1,8 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+
+def utc_now() -> datetime:
+    """Current time as a timezone-aware UTC datetime (replaces datetime.utcnow)."""
+    return datetime.now(timezone.utc)